@@ -12,6 +12,27 @@ import tempfile
 import zipfile
 # Add platform for OS detection
 import platform
+# Add json, time, threading, cProfile for per-operation instrumentation
+import json
+import time
+import threading
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+# resource is Unix-only; peak RSS is reported as 0 where it is missing (Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+# Add hashlib and a process pool for the OCR PDF tool
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from ocr_worker import init_worker, ocr_page
+# Add sqlite3 (FTS5) for the Index & Search tool
+import sqlite3
+import re
+from contextlib import closing
 
 # TitanPDF - Streamlit PDF Toolkit
 # Initial UI Scaffolding
@@ -27,6 +48,8 @@ TOOLS = [
     "PDF to Word",
     "JPG to PDF",
     "PDF to JPG",
+    "OCR PDF",
+    "Index & Search",
     "Add Watermark",
     "Add Page Numbers",
     "Protect PDF (Password)",
@@ -40,6 +63,422 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --- Instrumentation (JSON logs, Prometheus text export, optional cProfile) ---
+# Every tool runs inside track_operation(), which records phase timings,
+# byte/page/image counts and cache hits, appends one JSON line per operation
+# and rewrites a Prometheus text file (node_exporter textfile collector format).
+METRICS_DIR = os.environ.get("TITANPDF_METRICS_DIR", "metrics")
+OPERATIONS_LOG = os.path.join(METRICS_DIR, "operations.jsonl")
+PROMETHEUS_FILE = os.path.join(METRICS_DIR, "titanpdf.prom")
+PROFILES_DIR = os.path.join(METRICS_DIR, "profiles")
+# Duration histogram buckets (seconds), so p99 can be read off per tool
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class MetricsRegistry:
+    """Process-wide counters shared by all sessions and reruns."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # metric name -> {label tuple -> value}
+        self.counters = {}
+        # tool -> [bucket counts, sum, count]
+        self.durations = {}
+        self.peak_rss_bytes = 0
+
+    def inc(self, name, labels, value=1):
+        series = self.counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def observe(self, op, duration):
+        with self.lock:
+            tool = (("tool", op.tool),)
+            self.inc("titanpdf_operations_total", tool + (("status", op.status),))
+            buckets, total, count = self.durations.get(op.tool, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+            self.durations[op.tool] = (buckets, total + duration, count + 1)
+            for phase, seconds in op.phases.items():
+                self.inc("titanpdf_phase_seconds_total", tool + (("phase", phase),), seconds)
+            for key, value in op.counts.items():
+                self.inc(f"titanpdf_{key}_total", tool, value)
+            for cache, (hits, misses) in op.cache.items():
+                self.inc("titanpdf_cache_hits_total", (("cache", cache),), hits)
+                self.inc("titanpdf_cache_misses_total", (("cache", cache),), misses)
+            # Tracked here because resetting VmHWM also resets ru_maxrss
+            self.peak_rss_bytes = max(self.peak_rss_bytes, op.peak_rss_bytes, peak_rss_bytes())
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        def fmt(labels):
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+        def num(value):
+            # Full precision; "g" would round large byte counters to 6 digits
+            return str(value) if isinstance(value, int) else repr(float(value))
+
+        lines = []
+        with self.lock:
+            for name in sorted(self.counters):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{fmt(labels)} {num(value)}")
+            if self.durations:
+                lines.append("# TYPE titanpdf_operation_duration_seconds histogram")
+            for tool, (buckets, total, count) in sorted(self.durations.items()):
+                for bound, n in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f"titanpdf_operation_duration_seconds_bucket{fmt((('tool', tool), ('le', f'{bound:g}')))} {n}")
+                lines.append(f"titanpdf_operation_duration_seconds_bucket{fmt((('tool', tool), ('le', '+Inf')))} {count}")
+                lines.append(f"titanpdf_operation_duration_seconds_sum{fmt((('tool', tool),))} {num(total)}")
+                lines.append(f"titanpdf_operation_duration_seconds_count{fmt((('tool', tool),))} {count}")
+            lines.append("# HELP titanpdf_peak_rss_bytes Peak RSS of the server or any OCR worker since start.")
+            lines.append("# TYPE titanpdf_peak_rss_bytes gauge")
+            lines.append(f"titanpdf_peak_rss_bytes {self.peak_rss_bytes}")
+        return "\n".join(lines) + "\n"
+
+
+@st.cache_resource
+def get_metrics():
+    return MetricsRegistry()
+
+
+class Operation:
+    """Measurements for a single tool run; see track_operation()."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.phases = {}
+        self.counts = {"input_bytes": 0, "output_bytes": 0, "pages": 0, "images": 0}
+        # cache name -> (hits, misses)
+        self.cache = {}
+        self.status = "ok"
+        self.error = None
+        self.rss_delta_bytes = 0
+        # Peak RSS during this operation (see track_operation)
+        self.peak_rss_bytes = 0
+        self._phase = None
+        self._phase_start = None
+
+    def phase(self, name=None):
+        """End the current phase (if any) and start timing `name`."""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + now - self._phase_start
+        self._phase, self._phase_start = name, now
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def cache_result(self, cache, hit):
+        hits, misses = self.cache.get(cache, (0, 0))
+        self.cache[cache] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+    def fail(self, error):
+        """Mark a failure that was reported to the user instead of raised."""
+        self.status, self.error = "error", error
+
+
+def current_rss_bytes():
+    """Resident memory of this process right now (Linux only, else 0)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS mark (VmHWM); returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def vm_hwm_bytes():
+    """Peak RSS since the last reset_peak_rss() (Linux only, else 0)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def peak_rss_bytes():
+    """Process-lifetime peak RSS of the server or its largest finished child."""
+    if resource is None:
+        return 0
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def write_metrics_files(record, prom_text, profiler=None):
+    """Append the JSON log line, rewrite the .prom file and dump any profile."""
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        if profiler is not None:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            record["profile"] = os.path.join(PROFILES_DIR, f"{record['tool'].replace(' ', '_')}-{stamp}.prof")
+            profiler.dump_stats(record["profile"])
+        with open(OPERATIONS_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        # Write a private temp file then rename, so scrapers never see a
+        # half-written file even when several sessions finish at once
+        fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix=".prom.tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(prom_text)
+            os.replace(tmp_path, PROMETHEUS_FILE)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    except OSError:
+        # Metrics must never break a tool
+        pass
+
+
+@contextmanager
+def track_operation(tool_name):
+    """Time and count one tool run; use op.phase()/op.add() inside the block.
+
+    Set the "Profile operations" sidebar toggle or TITANPDF_PROFILE=1 to also
+    run the operation under cProfile. The JSON log carries the pid and thread
+    id so `py-spy dump --pid` can be pointed at a slow run.
+    """
+    op = Operation(tool_name)
+    profile = st.session_state.get("profile_operations") or os.environ.get("TITANPDF_PROFILE") == "1"
+    profiler = cProfile.Profile() if profile else None
+    rss_before = current_rss_bytes()
+    # On Linux, reset VmHWM so it reads as this operation's peak. Concurrent
+    # sessions share the process, so their operations can only lower it.
+    hwm_reset = reset_peak_rss()
+    start = time.perf_counter()
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active (e.g. a concurrent session)
+            profiler = None
+    try:
+        yield op
+    except Exception as e:
+        op.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        op.phase(None)
+        duration = time.perf_counter() - start
+        rss_after = current_rss_bytes()
+        op.rss_delta_bytes = rss_after - rss_before
+        # Without VmHWM, the larger of the start/end samples is a lower bound
+        op.peak_rss_bytes = (vm_hwm_bytes() if hwm_reset else 0) or max(rss_before, rss_after)
+        metrics = get_metrics()
+        metrics.observe(op, duration)
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "tool": tool_name,
+            "status": op.status,
+            "error": op.error,
+            "duration_s": round(duration, 6),
+            "phases_s": {k: round(v, 6) for k, v in op.phases.items()},
+            **op.counts,
+            "cache": {k: {"hits": h, "misses": m} for k, (h, m) in op.cache.items()},
+            "rss_delta_bytes": op.rss_delta_bytes,
+            "op_peak_rss_bytes": op.peak_rss_bytes,
+            "process_peak_rss_bytes": metrics.peak_rss_bytes,
+            "pid": os.getpid(),
+            "thread_id": threading.get_ident(),
+        }
+        write_metrics_files(record, metrics.render_prometheus(), profiler)
+
+# --- OCR cache and text layer ---
+# OCR'd words are stored per page hash, so re-runs and partially changed
+# documents only send new pages to Tesseract.
+CACHE_DIR = os.environ.get("TITANPDF_CACHE_DIR", "cache")
+OCR_CACHE_DIR = os.path.join(CACHE_DIR, "ocr")
+OCR_FONT = fitz.Font("helv")
+
+
+@st.cache_resource
+def tesseract_installed():
+    try:
+        fitz.get_tessdata()
+        return True
+    except RuntimeError:
+        return False
+
+
+def page_hash(doc, page, *extra):
+    """Hash a page's content stream, images and geometry without rendering it."""
+    h = hashlib.sha256()
+    h.update(page.read_contents())
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    h.update(repr((tuple(page.rect), page.rotation) + extra).encode())
+    return h.hexdigest()
+
+
+def ocr_cache_path(key):
+    return os.path.join(OCR_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def write_ocr_cache(key, words):
+    path = ocr_cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write a private temp file then rename, so a concurrent run never
+        # reads a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(words, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # A cache write failure only costs a re-OCR next time
+        pass
+
+
+def add_text_layers(doc, ocr_results):
+    """Overlay OCR words on the original pages as invisible (render mode 3) text.
+
+    `ocr_results` maps page numbers to words from ocr_worker.ocr_page, with
+    bboxes as fractions of the page. Each page's words are written to a
+    same-size page of one shared layer document (so the font is embedded only
+    once) and placed on top with show_pdf_page, which takes care of page
+    rotation and cropbox offsets.
+    """
+    page_nums = sorted(ocr_results)
+    with fitz.open() as layer:
+        for page_num in page_nums:
+            rect = doc[page_num].rect
+            layer_page = layer.new_page(width=rect.width, height=rect.height)
+            writer = fitz.TextWriter(layer_page.rect)
+            for x0, y0, x1, y1, text in ocr_results[page_num]:
+                bbox = fitz.Rect(x0 * rect.width, y0 * rect.height, x1 * rect.width, y1 * rect.height)
+                text_width = OCR_FONT.text_length(text, fontsize=1)
+                if bbox.is_empty or not text_width:
+                    continue
+                # Largest size that still fits the word's box, so words never overlap
+                fontsize = min(bbox.height / (OCR_FONT.ascender - OCR_FONT.descender), bbox.width / text_width)
+                writer.append((bbox.x0, bbox.y1 + OCR_FONT.descender * fontsize), text, font=OCR_FONT, fontsize=fontsize)
+            writer.write_text(layer_page, render_mode=3)
+        # Place the layers only once they are all written; show_pdf_page
+        # caches objects per source document
+        for layer_num, page_num in enumerate(page_nums):
+            doc[page_num].show_pdf_page(doc[page_num].rect, layer, layer_num)
+
+# --- Search index ---
+# A persistent SQLite FTS5 index with one row per page. Documents are keyed by
+# content hash, so re-uploading an unchanged file never re-extracts its text.
+# A copy of each indexed PDF is kept next to the index to render hit thumbnails.
+SEARCH_INDEX_PATH = os.path.join(CACHE_DIR, "search_index.db")
+INDEXED_PDFS_DIR = os.path.join(CACHE_DIR, "indexed_pdfs")
+# Control characters mark search hits in snippets; unlike "**" they cannot
+# appear in extracted text or be mangled by Markdown escaping
+HIT_START, HIT_END = "\x02", "\x03"
+
+
+def open_search_index():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(SEARCH_INDEX_PATH)
+    # WAL lets searches run while another session is indexing
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS documents ("
+        "doc_hash TEXT PRIMARY KEY, name TEXT, page_count INTEGER, indexed_at TEXT)"
+    )
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5("
+        "text, doc_hash UNINDEXED, page_num UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+    )
+    return conn
+
+
+def indexed_pdf_path(doc_hash):
+    return os.path.join(INDEXED_PDFS_DIR, f"{doc_hash}.pdf")
+
+
+def index_pdf(conn, name, pdf_bytes, op):
+    """Add one PDF to the index; returns False if it was already indexed."""
+    doc_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    if conn.execute("SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone():
+        op.cache_result("search_index", True)
+        return False
+    op.cache_result("search_index", False)
+    op.phase("parse")
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        rows = [(page.get_text(), doc_hash, page.number) for page in doc]
+    # Keep a copy of the PDF to render thumbnails of search hits. It is written
+    # (to a private temp file, then renamed) before the index rows, so an
+    # indexed document always has a complete copy.
+    op.phase("serialize")
+    os.makedirs(INDEXED_PDFS_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=INDEXED_PDFS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, indexed_pdf_path(doc_hash))
+    except OSError:
+        os.remove(tmp_path)
+        raise
+    # One transaction per file, so a failed upload leaves no partial pages
+    op.phase("process")
+    with conn:
+        conn.executemany("INSERT INTO pages (text, doc_hash, page_num) VALUES (?, ?, ?)", rows)
+        conn.execute(
+            "INSERT INTO documents VALUES (?, ?, ?, ?)",
+            (doc_hash, name, len(rows), datetime.now(timezone.utc).isoformat())
+        )
+    op.phase(None)
+    op.add(pages=len(rows))
+    return True
+
+
+def search_pages(conn, query, limit=20):
+    """Return (name, doc_hash, page_num, snippet) for the best matching pages.
+
+    Hits in the snippet are wrapped in HIT_START/HIT_END; see snippet_markdown().
+    """
+    # Quote every term so user input can never be parsed as FTS5 syntax
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if not terms:
+        return []
+    return conn.execute(
+        "SELECT d.name, p.doc_hash, p.page_num, snippet(pages, 0, ?, ?, ' … ', 16) "
+        "FROM pages p JOIN documents d ON d.doc_hash = p.doc_hash "
+        "WHERE pages MATCH ? ORDER BY rank LIMIT ?",
+        (HIT_START, HIT_END, " ".join(terms), limit)
+    ).fetchall()
+
+
+def escape_markdown(text):
+    """Backslash-escape Markdown (and $ LaTeX) syntax in untrusted text."""
+    return re.sub(r"([\\`*_{}\[\]()#+\-.!|$<>~])", r"\\\1", text)
+
+
+def snippet_markdown(snippet):
+    """Render a search_pages() snippet as Markdown with the hits in bold."""
+    text = escape_markdown(" ".join(snippet.split()))
+    return text.replace(HIT_START, "**").replace(HIT_END, "**")
+
+
+@st.cache_data(max_entries=500, show_spinner=False)
+def page_thumbnail(doc_hash, page_num):
+    with fitz.open(indexed_pdf_path(doc_hash)) as doc:
+        return doc[page_num].get_pixmap(dpi=30).tobytes("png")
+
 # Sidebar for tool selection
 st.sidebar.header("Select a Tool")
 tool = st.sidebar.radio("Choose a PDF tool:", TOOLS)
@@ -63,6 +502,8 @@ if tool == "🏠 Home":
                 <li>🔄 <b>Rotate PDF</b> — Flip it how you want</li>
                 <li>📝 <b>Word ↔️ PDF</b> — Convert both ways</li>
                 <li>🖼️ <b>JPG ↔️ PDF</b> — Images to docs, docs to images</li>
+                <li>🔍 <b>OCR PDF</b> — Make scans searchable, fully offline</li>
+                <li>🗂️ <b>Index & Search</b> — Find any page across all your PDFs</li>
                 <li>💧 <b>Add Watermark</b> — Brand your pages</li>
                 <li>🔢 <b>Add Page Numbers</b> — Stay organized</li>
                 <li>🔒 <b>Protect PDF</b> — Lock it down</li>
@@ -98,16 +539,21 @@ if tool == "Merge PDF":
             # Button to trigger merge
             if st.button("Merge PDFs"):
                 try:
-                    with st.spinner("Merging PDFs..."):
+                    with st.spinner("Merging PDFs..."), track_operation(tool) as op:
+                        op.add(input_bytes=sum(f.size for f in uploaded_files))
+                        op.phase("parse")
                         merger = PdfMerger()
                         # Add each uploaded PDF in order
                         for pdf_file in uploaded_files:
                             merger.append(pdf_file)
+                        op.add(pages=len(merger.pages))
                         # Output merged PDF to a BytesIO buffer
+                        op.phase("serialize")
                         merged_pdf_bytes = io.BytesIO()
                         merger.write(merged_pdf_bytes)
                         merger.close()
                         merged_pdf_bytes.seek(0)
+                        op.add(output_bytes=merged_pdf_bytes.getbuffer().nbytes)
                     st.success("PDFs merged successfully!")
                     # Download button for merged PDF
                     st.download_button(
@@ -139,14 +585,19 @@ elif tool == "Split PDF":
 
             if split_mode == "All Pages (each page as separate PDF)":
                 if st.button("Split All Pages"):
-                    with st.spinner("Splitting all pages..."):
+                    with st.spinner("Splitting all pages..."), track_operation(tool) as op:
+                        op.add(input_bytes=uploaded_file.size, pages=num_pages)
                         download_links = []
                         for i in range(num_pages):
+                            op.phase("process")
                             writer = PdfWriter()
                             writer.add_page(pdf_reader.pages[i])
+                            op.phase("serialize")
                             output = io.BytesIO()
                             writer.write(output)
                             output.seek(0)
+                            op.add(output_bytes=output.getbuffer().nbytes)
+                            op.phase(None)
                             # Show download button for each page
                             st.download_button(
                                 label=f"Download Page {i+1}",
@@ -173,12 +624,17 @@ elif tool == "Split PDF":
                     else:
                         with st.spinner("Splitting selected page range..."):
                             try:
-                                writer = PdfWriter()
-                                for i in range(start_page-1, end_page):
-                                    writer.add_page(pdf_reader.pages[i])
-                                output = io.BytesIO()
-                                writer.write(output)
-                                output.seek(0)
+                                with track_operation(tool) as op:
+                                    op.add(input_bytes=uploaded_file.size, pages=end_page - start_page + 1)
+                                    op.phase("process")
+                                    writer = PdfWriter()
+                                    for i in range(start_page-1, end_page):
+                                        writer.add_page(pdf_reader.pages[i])
+                                    op.phase("serialize")
+                                    output = io.BytesIO()
+                                    writer.write(output)
+                                    output.seek(0)
+                                    op.add(output_bytes=output.getbuffer().nbytes)
                                 st.download_button(
                                     label=f"Download Pages {start_page}-{end_page}",
                                     data=output,
@@ -199,12 +655,15 @@ elif tool == "Compress PDF":
     if uploaded_file is not None:
         if st.button("Compress PDF"):
             try:
-                with st.spinner("Compressing PDF (reducing image resolution and cleaning metadata)..."):
+                with st.spinner("Compressing PDF (reducing image resolution and cleaning metadata)..."), track_operation(tool) as op:
                     # Load PDF with fitz (PyMuPDF)
+                    op.phase("parse")
                     pdf_bytes = uploaded_file.read()
                     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                    op.add(input_bytes=len(pdf_bytes), pages=len(doc))
 
                     # Iterate through each page and each image, reduce image resolution
+                    op.phase("process")
                     for page_num in range(len(doc)):
                         page = doc[page_num]
                         img_list = page.get_images(full=True)
@@ -233,16 +692,19 @@ elif tool == "Compress PDF":
                                     img_byte_arr.seek(0)
                                     # Replace image in PDF
                                     page.replace_image(xref, img_byte_arr.read())
+                                    op.add(images=1)
                             except Exception as e:
                                 # If image processing fails, skip that image
                                 continue
                     # Remove metadata
                     doc.set_metadata({})
                     # Save compressed PDF to buffer
+                    op.phase("serialize")
                     compressed_pdf_bytes = io.BytesIO()
                     doc.save(compressed_pdf_bytes, garbage=4, deflate=True)
                     doc.close()
                     compressed_pdf_bytes.seek(0)
+                    op.add(output_bytes=compressed_pdf_bytes.getbuffer().nbytes)
                 st.success("PDF compressed successfully!")
                 st.download_button(
                     label="Download Compressed PDF",
@@ -263,18 +725,23 @@ elif tool == "Rotate PDF":
         angle = st.selectbox("Select rotation angle (degrees):", [90, 180, 270])
         if st.button("Rotate PDF"):
             try:
-                with st.spinner("Rotating all pages..."):
+                with st.spinner("Rotating all pages..."), track_operation(tool) as op:
                     # Read the PDF
+                    op.phase("parse")
                     pdf_reader = PdfReader(uploaded_file)
                     pdf_writer = PdfWriter()
+                    op.add(input_bytes=uploaded_file.size, pages=len(pdf_reader.pages))
                     # Rotate each page by the selected angle
+                    op.phase("process")
                     for page in pdf_reader.pages:
                         page.rotate(angle)
                         pdf_writer.add_page(page)
                     # Write rotated PDF to buffer
+                    op.phase("serialize")
                     rotated_pdf_bytes = io.BytesIO()
                     pdf_writer.write(rotated_pdf_bytes)
                     rotated_pdf_bytes.seek(0)
+                    op.add(output_bytes=rotated_pdf_bytes.getbuffer().nbytes)
                 st.success("PDF rotated successfully!")
                 st.download_button(
                     label="Download Rotated PDF",
@@ -294,7 +761,9 @@ elif tool == "Word to PDF":
     if uploaded_file is not None:
         if st.button("Convert to PDF"):
             try:
-                with st.spinner("Converting Word to PDF..."):
+                with st.spinner("Converting Word to PDF..."), track_operation(tool) as op:
+                    op.add(input_bytes=uploaded_file.size)
+                    op.phase("process")
                     # Save uploaded file to a temporary location
                     with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_word:
                         tmp_word.write(uploaded_file.read())
@@ -326,11 +795,13 @@ elif tool == "Word to PDF":
                             pypandoc.convert_file(word_path, 'pdf', outputfile=pdf_path)
                             converted = True
                         except Exception as e:
+                            op.fail(f"{type(e).__name__}: {e}")
                             st.error(f"Conversion failed: {e}")
 
                     if converted:
                         with open(pdf_path, "rb") as f:
                             pdf_bytes = f.read()
+                        op.add(output_bytes=len(pdf_bytes))
                         st.success("Word document converted to PDF!")
                         st.download_button(
                             label="Download PDF",
@@ -355,7 +826,9 @@ elif tool == "PDF to Word":
     if uploaded_file is not None:
         if st.button("Convert to Word"):
             try:
-                with st.spinner("Converting PDF to Word (.docx)..."):
+                with st.spinner("Converting PDF to Word (.docx)..."), track_operation(tool) as op:
+                    op.add(input_bytes=uploaded_file.size)
+                    op.phase("process")
                     # Save uploaded PDF to temp file
                     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
                         tmp_pdf.write(uploaded_file.read())
@@ -372,6 +845,7 @@ elif tool == "PDF to Word":
                         cv.close()
                         with open(docx_path, "rb") as f:
                             docx_bytes = f.read()
+                        op.add(output_bytes=len(docx_bytes))
                         st.success("PDF converted to Word (.docx)!")
                         st.download_button(
                             label="Download Word Document",
@@ -380,6 +854,7 @@ elif tool == "PDF to Word":
                             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
                         )
                     except Exception as e:
+                        op.fail(f"{type(e).__name__}: {e}")
                         st.error(f"Conversion failed: {e}")
                     # Clean up temp files
                     os.remove(pdf_path)
@@ -404,16 +879,21 @@ elif tool == "JPG to PDF":
         ordered_files = [next(f for f in uploaded_files if f.name == fname) for fname in order]
         if st.button("Convert to PDF"):
             try:
-                with st.spinner("Converting images to PDF..."):
+                with st.spinner("Converting images to PDF..."), track_operation(tool) as op:
+                    op.add(input_bytes=sum(f.size for f in ordered_files))
+                    op.phase("parse")
                     image_list = []
                     for file in ordered_files:
                         img = Image.open(file).convert("RGB")
                         image_list.append(img)
+                    op.add(images=len(image_list), pages=len(image_list))
                     # Save to PDF in memory
+                    op.phase("serialize")
                     pdf_bytes = io.BytesIO()
                     if image_list:
                         image_list[0].save(pdf_bytes, format="PDF", save_all=True, append_images=image_list[1:])
                         pdf_bytes.seek(0)
+                        op.add(output_bytes=pdf_bytes.getbuffer().nbytes)
                         st.success("Images converted to PDF!")
                         st.download_button(
                             label="Download PDF",
@@ -422,6 +902,7 @@ elif tool == "JPG to PDF":
                             mime="application/pdf"
                         )
                     else:
+                        op.fail("No images to convert")
                         st.error("No images to convert.")
             except Exception as e:
                 st.error(f"An error occurred during conversion: {e}")
@@ -434,16 +915,20 @@ elif tool == "PDF to JPG":
     if uploaded_file is not None:
         if st.button("Convert to JPG"):
             try:
-                with st.spinner("Converting PDF pages to JPG images..."):
+                with st.spinner("Converting PDF pages to JPG images..."), track_operation(tool) as op:
                     # Read PDF with fitz
+                    op.phase("parse")
                     pdf_bytes = uploaded_file.read()
                     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                    op.add(input_bytes=len(pdf_bytes), pages=len(doc))
+                    op.phase("process")
                     image_buffers = []
                     for page_num in range(len(doc)):
                         page = doc[page_num]
                         pix = page.get_pixmap(dpi=200)
                         img_bytes = io.BytesIO(pix.tobytes("jpg"))
                         image_buffers.append((page_num+1, img_bytes))
+                        op.add(images=1, output_bytes=img_bytes.getbuffer().nbytes)
                     if image_buffers:
                         st.success("PDF pages converted to JPG images!")
                         # Download links for each page
@@ -468,12 +953,160 @@ elif tool == "PDF to JPG":
                                 mime="application/zip"
                             )
                     else:
+                        op.fail("No images were generated")
                         st.error("No images were generated from the PDF.")
             except Exception as e:
                 st.error(f"An error occurred during conversion: {e}")
     else:
         st.info("Upload a PDF file to convert its pages to JPG images.")
 
+# --- OCR PDF Functionality ---
+elif tool == "OCR PDF":
+    uploaded_file = st.file_uploader("Upload a scanned PDF to make searchable", type=["pdf"])
+    if uploaded_file is not None:
+        language = st.text_input("OCR Language (Tesseract codes, e.g. eng or eng+deu)", value="eng")
+        dpi = st.select_slider("Scan Resolution (DPI)", options=[150, 200, 300, 400], value=300)
+        skip_text_pages = st.checkbox("Skip pages that already have text", value=True)
+        if not tesseract_installed():
+            st.error(
+                "Tesseract is not installed, so OCR is unavailable. "
+                "Install the packages listed in packages.txt (tesseract-ocr, tesseract-ocr-eng)."
+            )
+        elif st.button("Run OCR"):
+            try:
+                with st.spinner("Running OCR on scanned pages..."), track_operation(tool) as op:
+                    op.phase("parse")
+                    pdf_bytes = uploaded_file.read()
+                    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                    op.add(input_bytes=len(pdf_bytes), pages=len(doc))
+                    # Look up every scanned page in the OCR cache
+                    ocr_results = {}  # page number -> OCR'd words
+                    pending = []  # (page number, cache key) still to OCR
+                    for page_num in range(len(doc)):
+                        page = doc[page_num]
+                        if skip_text_pages and page.get_text().strip():
+                            continue
+                        key = page_hash(doc, page, dpi, language)
+                        if os.path.exists(ocr_cache_path(key)):
+                            with open(ocr_cache_path(key), encoding="utf-8") as f:
+                                ocr_results[page_num] = json.load(f)
+                            op.cache_result("ocr", True)
+                        else:
+                            pending.append((page_num, key))
+                            op.cache_result("ocr", False)
+                    # OCR uncached pages across a process pool
+                    op.phase("process")
+                    if pending:
+                        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
+                            tmp_pdf.write(pdf_bytes)
+                            pdf_path = tmp_pdf.name
+                        try:
+                            workers = min(len(pending), os.cpu_count() or 1)
+                            # Spawn, not fork: forking the multi-threaded Streamlit server can
+                            # deadlock a child on locks held by another session's thread
+                            with ProcessPoolExecutor(
+                                max_workers=workers,
+                                mp_context=multiprocessing.get_context("spawn"),
+                                initializer=init_worker
+                            ) as pool:
+                                results = pool.map(
+                                    ocr_page,
+                                    [pdf_path] * len(pending),
+                                    [page_num for page_num, _ in pending],
+                                    [dpi] * len(pending),
+                                    [language] * len(pending)
+                                )
+                                for (page_num, key), words in zip(pending, results):
+                                    ocr_results[page_num] = words
+                                    write_ocr_cache(key, words)
+                                    op.add(images=1)
+                        finally:
+                            os.remove(pdf_path)
+                    # Keep the original pages (images, links, annotations) and
+                    # only add the invisible text on top; nothing to save if
+                    # every page was skipped
+                    if ocr_results:
+                        add_text_layers(doc, ocr_results)
+                        op.phase("serialize")
+                        ocr_pdf_bytes = io.BytesIO()
+                        doc.save(ocr_pdf_bytes, garbage=3, deflate=True)
+                        ocr_pdf_bytes.seek(0)
+                        op.add(output_bytes=ocr_pdf_bytes.getbuffer().nbytes)
+                    doc.close()
+                if ocr_results:
+                    st.success(
+                        f"OCR complete: {len(ocr_results)} page(s) now searchable "
+                        f"({len(ocr_results) - len(pending)} from cache)."
+                    )
+                    st.download_button(
+                        label="Download Searchable PDF",
+                        data=ocr_pdf_bytes,
+                        file_name=os.path.splitext(uploaded_file.name)[0] + "_ocr.pdf",
+                        mime="application/pdf"
+                    )
+                else:
+                    st.warning("Every page already has text, so there was nothing to OCR.")
+            except Exception as e:
+                st.error(f"An error occurred during OCR: {e}")
+    else:
+        st.info("Upload a scanned PDF to add an invisible, searchable text layer. Runs fully offline with Tesseract.")
+
+# --- Index & Search Functionality ---
+elif tool == "Index & Search":
+    uploaded_files = st.file_uploader(
+        "Upload PDFs to add to the search index", type=["pdf"], accept_multiple_files=True
+    )
+    if uploaded_files:
+        if st.button("Index PDFs"):
+            try:
+                # New files can change the results of the current search
+                st.session_state.pop("search_results", None)
+                with st.spinner("Extracting text and indexing pages..."), track_operation("Index PDFs") as op:
+                    new_files = 0
+                    with closing(open_search_index()) as conn:
+                        for pdf_file in uploaded_files:
+                            pdf_bytes = pdf_file.getvalue()
+                            op.add(input_bytes=len(pdf_bytes))
+                            if index_pdf(conn, pdf_file.name, pdf_bytes, op):
+                                new_files += 1
+                st.success(
+                    f"Indexed {new_files} new file(s); "
+                    f"{len(uploaded_files) - new_files} unchanged file(s) were already indexed."
+                )
+            except Exception as e:
+                st.error(f"An error occurred while indexing: {e}")
+    try:
+        with closing(open_search_index()) as conn:
+            doc_count, page_count = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(page_count), 0) FROM documents"
+            ).fetchone()
+        st.write(f"**Indexed:** {doc_count} file(s), {page_count} page(s)")
+        query = st.text_input("Search all indexed PDFs")
+        if query.strip():
+            # Streamlit reruns the script on every widget change; only search
+            # (and record a metric) when the query itself changed
+            if st.session_state.get("search_results", (None,))[0] != query:
+                with track_operation("Search PDFs") as op, closing(open_search_index()) as conn:
+                    op.phase("process")
+                    start = time.perf_counter()
+                    hits = search_pages(conn, query)
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                st.session_state["search_results"] = (query, hits, elapsed_ms)
+            _, hits, elapsed_ms = st.session_state["search_results"]
+            st.caption(f"{len(hits)} matching page(s) in {elapsed_ms:.1f} ms")
+            for name, doc_hash, page_num, snippet in hits:
+                col1, col2 = st.columns([1, 4])
+                with col1:
+                    if os.path.exists(indexed_pdf_path(doc_hash)):
+                        st.image(page_thumbnail(doc_hash, page_num))
+                with col2:
+                    st.markdown(f"**{escape_markdown(name)}** — page {page_num + 1}")
+                    st.markdown(snippet_markdown(snippet))
+            if not hits:
+                st.warning("No pages match your search.")
+    except Exception as e:
+        st.error(f"An error occurred while searching: {e}")
+
 # --- Placeholders for other tools ---
 elif tool == "Add Watermark":
     uploaded_file = st.file_uploader("Upload a PDF to add or remove a watermark", type=["pdf"])
@@ -490,9 +1123,12 @@ elif tool == "Add Watermark":
                     st.error("Please enter watermark text.")
                 else:
                     try:
-                        with st.spinner("Adding watermark to all pages..."):
+                        with st.spinner("Adding watermark to all pages..."), track_operation(wm_action) as op:
+                            op.phase("parse")
                             pdf_bytes = uploaded_file.read()
                             doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                            op.add(input_bytes=len(pdf_bytes), pages=len(doc))
+                            op.phase("process")
                             for page in doc:
                                 # Calculate diagonal position
                                 rect = page.rect
@@ -512,10 +1148,12 @@ elif tool == "Add Watermark":
                                     fontname="helv"
                                 )
                             # Save watermarked PDF
+                            op.phase("serialize")
                             wm_pdf_bytes = io.BytesIO()
                             doc.save(wm_pdf_bytes)
                             doc.close()
                             wm_pdf_bytes.seek(0)
+                            op.add(output_bytes=wm_pdf_bytes.getbuffer().nbytes)
                         st.success("Watermark added!")
                         st.download_button(
                             label="Download Watermarked PDF",
@@ -529,9 +1167,12 @@ elif tool == "Add Watermark":
             st.info("This will attempt to remove watermarks added by this tool (same text, font, and color).")
             if st.button("Remove Watermark"):
                 try:
-                    with st.spinner("Attempting to remove watermark from all pages..."):
+                    with st.spinner("Attempting to remove watermark from all pages..."), track_operation(wm_action) as op:
+                        op.phase("parse")
                         pdf_bytes = uploaded_file.read()
                         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                        op.add(input_bytes=len(pdf_bytes), pages=len(doc))
+                        op.phase("process")
                         watermark_found = False
                         for page in doc:
                             # Extract all text spans
@@ -555,10 +1196,12 @@ elif tool == "Add Watermark":
                             if watermark_found:
                                 page.apply_redactions()
                         if watermark_found:
+                            op.phase("serialize")
                             clean_pdf_bytes = io.BytesIO()
                             doc.save(clean_pdf_bytes)
                             doc.close()
                             clean_pdf_bytes.seek(0)
+                            op.add(output_bytes=clean_pdf_bytes.getbuffer().nbytes)
                             st.success("Watermark removed!")
                             st.download_button(
                                 label="Download Clean PDF",
@@ -567,6 +1210,7 @@ elif tool == "Add Watermark":
                                 mime="application/pdf"
                             )
                         else:
+                            op.fail("Watermark not detected")
                             st.warning("Watermark not detected or cannot be removed safely.")
                 except Exception as e:
                     st.error(f"An error occurred while removing watermark: {e}")
@@ -585,9 +1229,12 @@ elif tool == "Add Page Numbers":
         )
         if st.button("Add Page Numbers"):
             try:
-                with st.spinner("Adding page numbers to all pages..."):
+                with st.spinner("Adding page numbers to all pages..."), track_operation(tool) as op:
+                    op.phase("parse")
                     pdf_bytes = uploaded_file.read()
                     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                    op.add(input_bytes=len(pdf_bytes), pages=len(doc))
+                    op.phase("process")
                     margin = 36  # 0.5 inch margin
                     for i, page in enumerate(doc):
                         page_num = i + 1
@@ -616,10 +1263,12 @@ elif tool == "Add Page Numbers":
                             align=align
                         )
                     # Save PDF with page numbers
+                    op.phase("serialize")
                     numbered_pdf_bytes = io.BytesIO()
                     doc.save(numbered_pdf_bytes)
                     doc.close()
                     numbered_pdf_bytes.seek(0)
+                    op.add(output_bytes=numbered_pdf_bytes.getbuffer().nbytes)
                 st.success("Page numbers added!")
                 st.download_button(
                     label="Download PDF with Page Numbers",
@@ -640,15 +1289,20 @@ elif tool == "Protect PDF (Password)":
                 st.error("Please enter a password.")
             else:
                 try:
-                    with st.spinner("Encrypting PDF with password..."):
+                    with st.spinner("Encrypting PDF with password..."), track_operation(tool) as op:
+                        op.phase("parse")
                         pdf_reader = PdfReader(uploaded_file)
+                        op.add(input_bytes=uploaded_file.size, pages=len(pdf_reader.pages))
+                        op.phase("process")
                         pdf_writer = PdfWriter()
                         for page in pdf_reader.pages:
                             pdf_writer.add_page(page)
                         pdf_writer.encrypt(password)
+                        op.phase("serialize")
                         protected_pdf_bytes = io.BytesIO()
                         pdf_writer.write(protected_pdf_bytes)
                         protected_pdf_bytes.seek(0)
+                        op.add(output_bytes=protected_pdf_bytes.getbuffer().nbytes)
                     st.success("PDF protected with password!")
                     st.download_button(
                         label="Download Protected PDF",
@@ -669,20 +1323,27 @@ elif tool == "Unlock PDF (Remove Password)":
                 st.error("Please enter the password.")
             else:
                 try:
-                    with st.spinner("Unlocking PDF..."):
+                    with st.spinner("Unlocking PDF..."), track_operation(tool) as op:
+                        op.phase("parse")
                         pdf_reader = PdfReader(uploaded_file)
+                        op.add(input_bytes=uploaded_file.size)
                         # Try to decrypt with the provided password
                         if pdf_reader.is_encrypted:
                             if not pdf_reader.decrypt(password):
+                                op.fail("Incorrect password")
                                 st.error("Incorrect password or unable to decrypt PDF.")
                             else:
+                                op.phase("process")
                                 pdf_writer = PdfWriter()
                                 for page in pdf_reader.pages:
                                     pdf_writer.add_page(page)
+                                op.add(pages=len(pdf_writer.pages))
                                 # Write out the unlocked PDF
+                                op.phase("serialize")
                                 unlocked_pdf_bytes = io.BytesIO()
                                 pdf_writer.write(unlocked_pdf_bytes)
                                 unlocked_pdf_bytes.seek(0)
+                                op.add(output_bytes=unlocked_pdf_bytes.getbuffer().nbytes)
                                 st.success("PDF unlocked!")
                                 st.download_button(
                                     label="Download Unlocked PDF",
@@ -691,12 +1352,16 @@ elif tool == "Unlock PDF (Remove Password)":
                                     mime="application/pdf"
                                 )
                         else:
+                            op.phase("process")
                             pdf_writer = PdfWriter()
                             for page in pdf_reader.pages:
                                 pdf_writer.add_page(page)
+                            op.add(pages=len(pdf_writer.pages))
+                            op.phase("serialize")
                             unlocked_pdf_bytes = io.BytesIO()
                             pdf_writer.write(unlocked_pdf_bytes)
                             unlocked_pdf_bytes.seek(0)
+                            op.add(output_bytes=unlocked_pdf_bytes.getbuffer().nbytes)
                             st.success("PDF unlocked!")
                             st.download_button(
                                 label="Download Unlocked PDF",
@@ -709,6 +1374,19 @@ elif tool == "Unlock PDF (Remove Password)":
     else:
         st.info("Upload a password-protected PDF and enter the password to unlock it.")
 
+# Metrics panel (rendered last so it includes the operation from this run)
+with st.sidebar.expander("📊 Metrics"):
+    st.checkbox("Profile operations (cProfile)", key="profile_operations")
+    prom_text = get_metrics().render_prometheus()
+    st.code(prom_text, language="text")
+    st.caption(f"Exported to `{PROMETHEUS_FILE}`, JSON log in `{OPERATIONS_LOG}`.")
+    st.download_button(
+        label="Download Metrics",
+        data=prom_text,
+        file_name="titanpdf.prom",
+        mime="text/plain"
+    )
+
 # Footer
 st.markdown("---")
 st.markdown("<center>Made with ❤️ By goblinasaddy | TitanPDF MVP</center>", unsafe_allow_html=True) 
\ No newline at end of file
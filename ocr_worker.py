@@ -0,0 +1,26 @@
+# TitanPDF - OCR worker processes for the "OCR PDF" tool
+# Kept out of app.py because Streamlit runs app.py as a script, and
+# ProcessPoolExecutor workers can only call functions from importable modules.
+import os
+import fitz
+
+
+def init_worker():
+    # One Tesseract thread per process; the pool already uses every core
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def ocr_page(pdf_path, page_num, dpi, language):
+    """Rasterize and OCR one page.
+
+    Returns [x0, y0, x1, y1, word] lists with the bbox given as fractions of
+    the page size, so the caller can place them on the original page.
+    """
+    with fitz.open(pdf_path) as doc:
+        pix = doc[page_num].get_pixmap(dpi=dpi)
+    with fitz.open(stream=pix.pdfocr_tobytes(compress=True, language=language), filetype="pdf") as ocr_doc:
+        rect = ocr_doc[0].rect
+        return [
+            [x0 / rect.width, y0 / rect.height, x1 / rect.width, y1 / rect.height, text]
+            for x0, y0, x1, y1, text, *_ in ocr_doc[0].get_text("words")
+        ]